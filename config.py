@@ -2,24 +2,23 @@
 Configuration settings for the Document Generator application.
 """
 import os
-from datetime import timedelta
+
+# Development fallback secret key, generated once per process
+_FALLBACK_KEY = 'dev-secret-key-change-in-production-' + os.urandom(24).hex()
 
 class Config:
     """Base configuration."""
     # Secret key for session management and CSRF protection
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production-' + os.urandom(24).hex()
+    SECRET_KEY = os.environ.get('SECRET_KEY') or _FALLBACK_KEY
     
     # Application settings
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     TESTING = False
     
     # File upload and storage
-    TEMP_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
     TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'doc_templates')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    
-    # Temp file cleanup settings
-    TEMP_FILE_MAX_AGE = timedelta(hours=24)  # Delete files older than 24 hours
+    MAX_RICHTEXT_LEN = 200_000  # Max characters per rich-text form field
     
     # Security settings
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
@@ -30,6 +29,10 @@ class Config:
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None  # No time limit for CSRF tokens
     
+    # Invoice list pagination
+    INVOICE_PAGE_SIZE = 50
+    INVOICE_MAX_PAGE_SIZE = 200
+    
     # Invoice Generator password protection
     INVOICE_GENERATOR_PASSWORD = os.environ.get('INVOICE_GENERATOR_PASSWORD') or 'invoice123'  # Change this in production
 
@@ -41,6 +44,8 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     SESSION_COOKIE_SECURE = True  # Require HTTPS in production
+    TEMPLATES_AUTO_RELOAD = False  # Don't stat template files on every render
+    SEND_FILE_MAX_AGE_DEFAULT = 31536000  # Let clients cache static files for a year
 
 class TestingConfig(Config):
     """Testing configuration."""
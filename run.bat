@@ -23,7 +23,6 @@ if errorlevel 1 (
 
 REM Create necessary directories
 echo 📁 Creating directories...
-if not exist "temp\" mkdir temp
 if not exist "doc_templates\" mkdir doc_templates
 
 REM Check for .env file
@@ -22,7 +22,6 @@ fi
 
 # Create necessary directories
 echo "📁 Creating directories..."
-mkdir -p temp
 mkdir -p doc_templates
 
 # Check for .env file
@@ -70,3 +70,254 @@ def test_config_loading():
     assert app.config['TESTING'] is True
     assert app.config['WTF_CSRF_ENABLED'] is False
 
+
+
+def test_load_template_reuses_cached_bytes(tmp_path):
+    """Test templates are read from disk only when they change."""
+    from docx import Document
+    from app import load_template, _TEMPLATE_CACHE
+
+    template_path = tmp_path / "TEST.docx"
+    Document().save(str(template_path))
+
+    _, variables = load_template("TEST", str(template_path))
+    assert variables == frozenset()
+    cached = _TEMPLATE_CACHE["TEST"]
+    load_template("TEST", str(template_path))
+    assert _TEMPLATE_CACHE["TEST"] is cached
+
+    os.utime(template_path, (0, 0))
+    load_template("TEST", str(template_path))
+    assert _TEMPLATE_CACHE["TEST"] is not cached
+    _TEMPLATE_CACHE.pop("TEST")
+
+
+def test_load_template_finds_variables_in_properties(tmp_path):
+    """Test variables used only in document properties still get their views."""
+    from docx import Document
+    from app import load_template, _TEMPLATE_CACHE, _CONTEXT_VIEWS, _DOCX_JINJA_ENV
+
+    template_path = tmp_path / "PROPS.docx"
+    template = Document()
+    template.core_properties.title = "{{ petitioner_names }}"
+    template.save(str(template_path))
+
+    doc, variables = load_template("PROPS", str(template_path))
+    _TEMPLATE_CACHE.pop("PROPS")
+    assert "petitioner_names" in variables
+
+    context = {"petitioner_list": [{'name': 'Ravi', 'address': ''}]}
+    for name in variables & _CONTEXT_VIEWS.keys():
+        context[name] = _CONTEXT_VIEWS[name](context)
+    doc.render(context, _DOCX_JINJA_ENV)
+    assert doc.docx.core_properties.title == "Ravi"
+
+
+def test_save_document_matches_docx_save(tmp_path):
+    """Test the fast document writer produces the same package as doc.save()."""
+    import io
+    import zipfile
+    from docx import Document
+    from app import load_template, save_document, _TEMPLATE_CACHE
+
+    template_path = tmp_path / "SAVE.docx"
+    template = Document()
+    template.add_paragraph("{{ district }}")
+    template.save(str(template_path))
+
+    doc, _ = load_template("SAVE", str(template_path))
+    doc.render({"district": "Krishna"})
+    fast, default = io.BytesIO(), io.BytesIO()
+    save_document(doc, fast)
+    doc.save(default)
+    _TEMPLATE_CACHE.pop("SAVE")
+
+    assert Document(fast).paragraphs[0].text == "Krishna"
+    assert zipfile.ZipFile(fast).namelist() == zipfile.ZipFile(default).namelist()
+
+
+def test_party_list_views():
+    """Test the derived party list views used by document templates."""
+    from app import names_of, joined_block, first_of
+
+    parties = [{'name': 'A', 'address': 'X\nY'}, {'name': 'B', 'address': 'Z'}]
+    assert names_of(parties) == ['A', 'B']
+    assert joined_block(parties) == "A\nX\nY\n\nB\nZ"
+    assert first_of(parties) == parties[0]
+    assert first_of([]) == {'name': '', 'address': ''}
+
+
+def test_extract_plain():
+    """Test plain text extraction from rich-text editor HTML."""
+    from app import extract_plain
+
+    assert extract_plain("") == ""
+    assert extract_plain("<p>Line 1</p><p><br></p><p>Line 2</p>") == "Line 1\n\nLine 2"
+    assert extract_plain("Mr. <strong>Bob</strong> Smith") == "Mr. Bob Smith"
+    assert extract_plain("one<br>two<br/>three") == "one\ntwo\nthree"
+    assert extract_plain("<h1>PRAYER</h1><p>It is prayed</p>") == "PRAYER\nIt is prayed"
+    assert extract_plain("<blockquote>Quoted</blockquote><pre>Code</pre>Rest") == "Quoted\nCode\nRest"
+    assert extract_plain(
+        "<ol><li>Issue a writ</li><li>Award costs</li></ol><p>Pass such other orders</p>"
+    ) == "Issue a writ\nAward costs\nPass such other orders"
+    assert extract_plain("<p>A &amp; B</p>") == "A & B"
+    assert extract_plain("a < b") == "a < b"
+    assert extract_plain("a < b <b>c</b>") == "a < b \nc"
+    assert extract_plain("M/s A<B Traders") == "M/s A<B Traders"
+    assert extract_plain("a<b") == "a<b"
+
+
+def test_build_party_list():
+    """Test party lists skip unnamed rows and tidy address lines."""
+    from app import _build_party_list
+
+    parties = _build_party_list(
+        ["<p>Ravi</p>", "", "Sita"],
+        ["<p>12 Main Road </p><p><br></p><p> Vijayawada</p>", "ignored", ""],
+    )
+    assert parties == [
+        {'name': 'Ravi', 'address': '12 Main Road\nVijayawada'},
+        {'name': 'Sita', 'address': ''},
+    ]
+
+
+def test_home_page_cache_keeps_flash_messages(client):
+    """Test the cached home page still shows pending flash messages."""
+    first = client.get('/')
+    assert client.get('/').data == first.data
+
+    client.get('/form/INVALID_TYPE')
+    response = client.get('/')
+    assert b'Invalid document type selected.' in response.data
+    assert b'Invalid document type selected.' not in client.get('/').data
+
+
+def test_generate_rejects_oversized_richtext(client):
+    """Test oversized rich-text fields are rejected before parsing."""
+    response = client.post('/generate', data={
+        'doc_type': 'WP',
+        'date': '01/01/2025',
+        'district': 'Krishna',
+        'petitioner_names': 'A',
+        'respondent_names': 'B',
+        'main_prayer': 'x' * (app.config['MAX_RICHTEXT_LEN'] + 1),
+    }, follow_redirects=True)
+    assert b'Main prayer exceeds maximum length' in response.data
+
+
+def test_number_to_words():
+    """Test amounts are spelled out in the Indian numbering system."""
+    from app import number_to_words
+
+    assert number_to_words(0) == "Zero Rupees Only"
+    assert number_to_words("115") == "One Hundred Fifteen Rupees Only"
+    assert number_to_words(12345678.9) == (
+        "One Crore Twenty Three Lakh Forty Five Thousand Six Hundred Seventy Eight Rupees Only"
+    )
+    assert number_to_words("n/a") == "n/a"
+
+
+def test_inr_filter():
+    """Test amounts are grouped in the Indian numbering system."""
+    from app import inr
+
+    assert inr(0) == "0.00"
+    assert inr(999) == "999.00"
+    assert inr(1234) == "1,234.00"
+    assert inr(123456789.5) == "12,34,56,789.50"
+    assert inr(-100000) == "-1,00,000.00"
+
+
+def test_parse_ref_month():
+    """Test issue dates are parsed into the Ref No year and month."""
+    from app import parse_ref_month
+
+    assert parse_ref_month("05/03/2025") == ("2025", 3)
+    assert parse_ref_month("2025-12-01") == ("2025", 12)
+    assert parse_ref_month("2025-13-01") is None
+    assert parse_ref_month("05/xx/2025") is None
+    assert parse_ref_month("2025-03/01") is None
+    assert parse_ref_month("") is None
+
+
+def test_parse_invoice_items():
+    """Test invoice rows skip empty descriptions and default empty rates."""
+    from werkzeug.datastructures import MultiDict
+    from app import parse_invoice_items
+
+    form = MultiDict([
+        ("items-description", "Drafting"), ("items-rate", "1500"),
+        ("items-description", ""), ("items-rate", "999"),
+        ("items-description", "Filing"), ("items-rate", ""),
+        ("items-description", "Appearance"), ("items-rate", "2500.50"),
+    ])
+    assert parse_invoice_items(form) == [
+        {"description": "Drafting", "qty": 1, "rate": 1500.0},
+        {"description": "Filing", "qty": 1, "rate": 0.0},
+        {"description": "Appearance", "qty": 1, "rate": 2500.5},
+    ]
+    assert parse_invoice_items(MultiDict()) == []
+
+
+class _StubSnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _StubInvoices:
+    """Just enough of a Firestore collection query for the invoice list."""
+
+    def __init__(self, invoices, offset=0, count=None):
+        self.invoices = invoices
+        self.offset = offset
+        self.count = count
+
+    def select(self, fields):
+        return self
+
+    def order_by(self, field, direction=None):
+        return self
+
+    def start_after(self, snap):
+        ids = [inv["invoice_id"] for inv in self.invoices]
+        return _StubInvoices(self.invoices, ids.index(snap.to_dict()["invoice_id"]) + 1)
+
+    def limit(self, count):
+        return _StubInvoices(self.invoices, self.offset, count)
+
+    def stream(self):
+        return [_StubSnapshot(inv) for inv in self.invoices[self.offset:self.offset + self.count]]
+
+    def document(self, invoice_id):
+        found = [inv for inv in self.invoices if inv["invoice_id"] == invoice_id]
+        return type("_Ref", (), {"get": lambda ref: _StubSnapshot(found[0] if found else None)})()
+
+
+def test_invoice_list_pagination(client, monkeypatch):
+    """Test invoice list pages follow the cursor and restart on a stale one."""
+    import app as app_module
+
+    invoices = [
+        {"invoice_id": f"INV{n}", "issue_date": "01/01/2025", "case_ref": ""}
+        for n in range(5, 0, -1)
+    ]
+    stub = _StubInvoices(invoices)
+    monkeypatch.setattr(app_module, "db", type("_Db", (), {"collection": lambda db, name: stub})())
+    with client.session_transaction() as sess:
+        sess['invoice_authenticated'] = True
+
+    first = client.get('/invoices?page_size=2')
+    assert b'INV5' in first.data and b'INV4' in first.data and b'INV3' not in first.data
+    assert b'cursor=INV4' in first.data
+
+    last = client.get('/invoices?page_size=2&cursor=INV2')
+    assert b'INV1' in last.data and b'INV2' not in last.data
+    assert b'cursor=INV1' not in last.data
+
+    stale = client.get('/invoices?page_size=2&cursor=DELETED')
+    assert stale.status_code == 302
+    assert stale.headers['Location'].endswith('/invoices?page_size=2')